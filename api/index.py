@@ -4,17 +4,22 @@
 Vercel-compatible Flask API for UML Class Diagram Generator
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, send_file
 from flask_cors import CORS
+from flask_compress import Compress
 import os
 import sys
 import json
+import logging
 import uuid
 import tempfile
 from datetime import datetime
-from PIL import Image
+from PIL import Image, ImageDraw
 import io
 import base64
+import threading
+import hashlib
+from collections import Counter
 
 # Add the src directory to Python path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -23,31 +28,62 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 from diagramDraw import mergeBoxes, loadFonts, note, clear_notes, drawConnection, draw_proper_generalization
 from connection import ConnectionManager, ConnectionType, UMLConnection
 from classBox import createSingleUMLClass
+from payloadCache import LRUCache, payload_key
 
 app = Flask(__name__)
 CORS(app)
 
+# Compress text responses (PlantUML, JSON, the page itself); PNG downloads are already deflated
+app.config['COMPRESS_MIMETYPES'] = ['application/json', 'text/html', 'text/plain']
+app.config['COMPRESS_LEVEL'] = 4
+app.config['COMPRESS_MIN_SIZE'] = 512
+Compress(app)
+
+# Per-connection drawing details are logged at DEBUG; set LOG_LEVEL=DEBUG to see them
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'WARNING').upper()
+if not isinstance(logging.getLevelName(LOG_LEVEL), int):
+    app.logger.warning("Unknown LOG_LEVEL %r, using WARNING", LOG_LEVEL)
+    LOG_LEVEL = 'WARNING'
+app.logger.setLevel(LOG_LEVEL)
+
 # Global storage for diagram data
 diagrams_storage = {}
 
+# UML visibility symbols keyed by visibility name
+VISIBILITY_SYMBOLS = {
+    'public': '+',
+    'private': '-',
+    'protected': '#'
+}
+
+# Fast zlib setting for PNG responses - encode latency matters more than a few KB;
+# level 1 is no faster than 3 on these mostly-white images and encodes larger
+PNG_COMPRESS_LEVEL = 3
+
+# Load fonts once at import so warm invocations reuse the parsed font
+try:
+    BASE_FONT, FONT_SIZE = loadFonts()
+except:
+    BASE_FONT, FONT_SIZE = None, 12
+
 class UMLDiagramService:
     """Service class to handle UML diagram generation"""
     
     def __init__(self):
-        try:
-            self.base_font, self.font_size = loadFonts()
-        except:
-            self.base_font, self.font_size = None, 12
-        self.connection_manager = ConnectionManager()
+        self.base_font, self.font_size = BASE_FONT, FONT_SIZE
+        self._local = threading.local()
+    
+    @property
+    def connection_manager(self):
+        """Per-thread ConnectionManager, reused across requests handled by that thread"""
+        manager = getattr(self._local, 'connection_manager', None)
+        if manager is None:
+            manager = self._local.connection_manager = ConnectionManager()
+        return manager
     
     def get_visibility_symbol(self, visibility):
         """Convert visibility string to UML symbol"""
-        symbols = {
-            'public': '+',
-            'private': '-',
-            'protected': '#'
-        }
-        return symbols.get(visibility, '+')
+        return VISIBILITY_SYMBOLS.get(visibility, '+')
     
     def create_class_box(self, class_data, outline_color='blue', outline_width=2):
         """Create a UML class box from class data - simplified for Vercel"""
@@ -55,179 +91,145 @@ class UMLDiagramService:
         
         # Create a simple text representation for Vercel deployment
         # In a full deployment, this would use the actual mergeBoxes function
-        text_repr = f"Class: {class_name}\n"
+        visibility_symbol = VISIBILITY_SYMBOLS.get
+        lines = [f"Class: {class_name}"]
         
         # Format attributes
-        for attr in class_data.get('attributes', []):
-            visibility_symbol = self.get_visibility_symbol(attr.get('visibility', 'private'))
-            text_repr += f"{visibility_symbol}{attr.get('name', '')}: {attr.get('type', '')}\n"
+        lines.extend([
+            f"{visibility_symbol(attr.get('visibility', 'private'), '+')}{attr.get('name', '')}: {attr.get('type', '')}"
+            for attr in class_data.get('attributes', [])
+        ])
         
         # Format operations
-        for op in class_data.get('operations', []):
-            visibility_symbol = self.get_visibility_symbol(op.get('visibility', 'public'))
-            text_repr += f"{visibility_symbol}{op.get('name', '')}\n"
+        lines.extend([
+            f"{visibility_symbol(op.get('visibility', 'public'), '+')}{op.get('name', '')}"
+            for op in class_data.get('operations', [])
+        ])
         
-        return text_repr
+        lines.append('')  # Keep the trailing newline
+        return '\n'.join(lines)
     
     def generate_simple_diagram(self, classes_data, styling_options=None):
-        """Generate a complete UML diagram using robust UML modules"""
+        """Generate a complete UML diagram using robust UML modules
+        
+        Rendering errors propagate to the caller so a failed render is never cached.
+        """
         if not classes_data:
             return None
         
-        try:
-            # Create larger canvas for proper UML diagram
-            img_width = styling_options.get('image_width', 1400) if styling_options else 1400
-            img_height = styling_options.get('image_height', 1000) if styling_options else 1000
+        # Resolve styling options once for the whole request
+        styling = styling_options or {}
+        outline_color = styling.get('outline_color', 'black')
+        outline_width = styling.get('outline_width', 2)
+        
+        # Create larger canvas for proper UML diagram
+        img_width = styling.get('image_width', 1400)
+        img_height = styling.get('image_height', 1000)
+        
+        # Create main diagram image
+        diagram_image = Image.new('RGB', (img_width, img_height), 'white')
+        
+        # Reuse fonts loaded at import time
+        font = BASE_FONT
+        
+        # Clear notes for collision detection
+        clear_notes()
+        
+        # Reset the reusable connection manager
+        connection_manager = self.connection_manager
+        connection_manager.clear()
+        
+        # Process each class and create UML boxes
+        class_name_to_info = {}
+        
+        visibility_symbol = VISIBILITY_SYMBOLS.get
+        
+        # First pass: create all class boxes, accumulating layout height as we go
+        boxes = []  # (class_id, class_name, class_box) in class order
+        total_height = 0
+        for i, class_data in enumerate(classes_data):
+            class_id = class_data.get('id', f'class_{i}')
+            class_name = class_data.get('name', f'Class{i+1}')
+            attributes = class_data.get('attributes', [])
+            operations = class_data.get('operations', [])
             
-            # Create main diagram image
-            diagram_image = Image.new('RGB', (img_width, img_height), 'white')
+            # Format attributes using proper visibility symbols, skipping unnamed ones
+            attr_list = [
+                f"{visibility_symbol(attr.get('visibility', 'private'), '+')}{attr['name']}: {attr.get('type', '')}"
+                for attr in attributes if attr.get('name')
+            ]
             
-            # Load fonts using robust module
-            font, font_size = loadFonts()
+            # Format operations using proper visibility symbols, skipping unnamed ones
+            op_list = [
+                f"{visibility_symbol(op.get('visibility', 'public'), '+')}{op['name']}"
+                f"({', '.join([p.get('name', '') + ': ' + p.get('type', '') for p in op.get('parameters', [])])})"
+                f": {op.get('returnType', 'void')}"
+                for op in operations if op.get('name')
+            ]
             
-            # Clear notes for collision detection
-            clear_notes()
+            # Create UML class box using robust mergeBoxes function
+            class_box = mergeBoxes(
+                name=class_name,
+                attributes='\n'.join(attr_list),
+                operations='\n'.join(op_list),
+                font=font,
+                fontSize=12,
+                outline_colour=outline_color,
+                outline_width=outline_width
+            )
+            boxes.append((class_id, class_name, class_box))
+            total_height += class_box.size[1]
+        
+        # Center the entire single-column layout vertically
+        vertical_spacing = 60  # Space between boxes
+        total_layout_height = total_height + (vertical_spacing * (len(boxes) - 1))
+        current_y = max(40, (img_height - total_layout_height) // 2)
+        
+        # Second pass: position and paste each box
+        for class_id, class_name, class_box in boxes:
+            # Calculate position - centered single column layout
+            box_width, box_height = class_box.size
+            pos_x = (img_width - box_width) // 2  # Center each box horizontally
+            pos_y = current_y
             
-            # Initialize connection manager
-            connection_manager = ConnectionManager()
+            # Ensure positions are within bounds
+            pos_x = max(20, min(pos_x, img_width - box_width - 20))
+            pos_y = max(20, min(pos_y, img_height - box_height - 20))
             
-            # Process each class and create UML boxes
-            class_boxes = {}
-            class_positions = {}
+            # Store class position and size for connection drawing
+            class_name_to_info[class_name] = {
+                'position': (pos_x, pos_y),
+                'size': class_box.size,
+                'id': class_id,
+                'rect': (pos_x, pos_y, box_width, box_height),
+                'center': (pos_x + box_width // 2, pos_y + box_height // 2),
+                'top_center': (pos_x + box_width // 2, pos_y),
+                'bottom_center': (pos_x + box_width // 2, pos_y + box_height)
+            }
+            current_y += box_height + vertical_spacing
             
-            # First pass: create all class boxes to know their sizes
-            temp_class_boxes = {}
-            for i, class_data in enumerate(classes_data):
-                class_id = class_data.get('id', f'class_{i}')
-                class_name = class_data.get('name', f'Class{i+1}')
-                attributes = class_data.get('attributes', [])
-                operations = class_data.get('operations', [])
-                
-                # Format attributes using proper visibility symbols
-                attr_list = []
-                for attr in attributes:
-                    visibility = self.get_visibility_symbol(attr.get('visibility', 'private'))
-                    attr_name = attr.get('name', '')
-                    attr_type = attr.get('type', '')
-                    if attr_name:  # Only add non-empty attributes
-                        attr_list.append(f"{visibility}{attr_name}: {attr_type}")
-                
-                # Format operations using proper visibility symbols
-                op_list = []
-                for op in operations:
-                    visibility = self.get_visibility_symbol(op.get('visibility', 'public'))
-                    op_name = op.get('name', '')
-                    return_type = op.get('returnType', 'void')
-                    
-                    # Format parameters
-                    params = op.get('parameters', [])
-                    if params:
-                        param_str = ', '.join([f"{p.get('name', '')}: {p.get('type', '')}" for p in params])
-                        op_text = f"{visibility}{op_name}({param_str}): {return_type}"
-                    else:
-                        op_text = f"{visibility}{op_name}(): {return_type}"
-                    
-                    if op_name:  # Only add non-empty operations
-                        op_list.append(op_text)
-                
-                # Get styling options
-                outline_color = styling_options.get('outline_color', 'black') if styling_options else 'black'
-                outline_width = styling_options.get('outline_width', 2) if styling_options else 2
-                
-                # Create UML class box using robust mergeBoxes function
-                class_box = mergeBoxes(
-                    name=class_name,
-                    attributes='\n'.join(attr_list) if attr_list else '',
-                    operations='\n'.join(op_list) if op_list else '',
-                    font=font,
-                    fontSize=12,
-                    outline_colour=outline_color,
-                    outline_width=outline_width
-                )
-                temp_class_boxes[class_id] = class_box
-            
-            # Calculate layout positions with better centering
-            if classes_data:
-                # Calculate total height needed for all boxes
-                total_height = sum(temp_class_boxes[class_data.get('id', f'class_{i}')].size[1] for i, class_data in enumerate(classes_data))
-                vertical_spacing = 60  # Space between boxes
-                total_layout_height = total_height + (vertical_spacing * (len(classes_data) - 1))
-                
-                # Center the entire layout vertically
-                start_y = max(40, (img_height - total_layout_height) // 2)
-                
-                # Center horizontally (all boxes in single column)
-                max_width = max(temp_class_boxes[class_data.get('id', f'class_{i}')].size[0] for i, class_data in enumerate(classes_data))
-                start_x = (img_width - max_width) // 2
-                
-                current_y = start_y
-                
-            for i, class_data in enumerate(classes_data):
-                class_id = class_data.get('id', f'class_{i}')
-                class_name = class_data.get('name', f'Class{i+1}')
-                class_box = temp_class_boxes[class_id]
-                
-                # Calculate position - centered single column layout
-                box_width, box_height = class_box.size
-                pos_x = (img_width - box_width) // 2  # Center each box horizontally
-                pos_y = current_y
-                
-                # Ensure positions are within bounds
-                pos_x = max(20, min(pos_x, img_width - box_width - 20))
-                pos_y = max(20, min(pos_y, img_height - box_height - 20))
-                
-                # Store class box and position
-                class_boxes[class_id] = class_box
-                class_positions[class_id] = (pos_x, pos_y)
-                current_y += box_height + vertical_spacing
-                
-                # Register class position with connection manager
-                connection_manager.add_class_position(
-                    class_name, pos_x, pos_y, class_box.size[0], class_box.size[1]
-                )
-                
-                # Paste the class box onto the main diagram
-                diagram_image.paste(class_box, (pos_x, pos_y))
-            
-            # Draw connections using robust connection drawing with generalization detection
-            self._draw_connections_with_robust_modules(
-                diagram_image, classes_data, class_positions, class_boxes, connection_manager
+            # Register class position with connection manager
+            connection_manager.add_class_position(
+                class_name, pos_x, pos_y, box_width, box_height
             )
             
-            return diagram_image
-            
-        except Exception as e:
-            print(f"Error generating diagram: {e}")
-            import traceback
-            traceback.print_exc()
-            # Return a minimal valid image with error info
-            try:
-                minimal_image = Image.new('RGB', (400, 300), 'white')
-                from PIL import ImageDraw
-                draw = ImageDraw.Draw(minimal_image)
-                draw.text((10, 10), "UML Diagram", fill='black')
-                draw.text((10, 30), f"Error: {str(e)}", fill='red')
-                return minimal_image
-            except:
-                return None
+            # Paste the class box onto the main diagram
+            diagram_image.paste(class_box, (pos_x, pos_y))
+        
+        # Draw connections using robust connection drawing with generalization detection
+        self._draw_connections_with_robust_modules(
+            diagram_image, classes_data, class_name_to_info, connection_manager
+        )
+        
+        return diagram_image
     
-    def _draw_connections_with_robust_modules(self, image, classes_data, class_positions, class_boxes, connection_manager):
+    def _draw_connections_with_robust_modules(self, image, classes_data, class_name_to_info, connection_manager):
         """Draw connections using robust modules with generalization detection"""
-        print(f"🔗 Drawing connections for {len(classes_data)} classes")
+        # Nothing to route for diagrams without any relationships
+        if not any(class_data.get('connections') for class_data in classes_data):
+            return
         
-        # Create a mapping of class names to IDs and positions
-        class_name_to_info = {}
-        for class_data in classes_data:
-            class_id = class_data.get('id')
-            class_name = class_data.get('name')
-            if class_id in class_positions and class_id in class_boxes:
-                pos = class_positions[class_id]
-                box = class_boxes[class_id]
-                class_name_to_info[class_name] = {
-                    'position': pos,
-                    'size': box.size,
-                    'id': class_id
-                }
+        app.logger.debug("Drawing connections for %d classes", len(classes_data))
         
         # First, collect all connections and group inheritance connections by target
         all_connections = []
@@ -261,26 +263,11 @@ class UMLDiagramService:
         for target_name, source_names in inheritance_groups.items():
             if len(source_names) > 1:
                 # Multiple inheritance - use proper generalization
-                print(f"🔗 Drawing generalization: {source_names} -> {target_name}")
+                app.logger.debug("Drawing generalization: %s -> %s", source_names, target_name)
                 
-                target_info = class_name_to_info[target_name]
-                target_pos = target_info['position']
-                target_size = target_info['size']
-                
-                # Calculate parent connection point (top edge center)
-                parent_x = target_pos[0] + target_size[0] // 2
-                parent_y = target_pos[1]  # Top edge
-                parent_pos = (parent_x, parent_y)
-                
-                # Calculate children connection points (bottom edge centers)
-                children_positions = []
-                for source_name in source_names:
-                    source_info = class_name_to_info[source_name]
-                    source_pos = source_info['position']
-                    source_size = source_info['size']
-                    child_x = source_pos[0] + source_size[0] // 2
-                    child_y = source_pos[1] + source_size[1]  # Bottom edge
-                    children_positions.append((child_x, child_y))
+                # Parent connects at its top edge center, children at their bottom edge centers
+                parent_pos = class_name_to_info[target_name]['top_center']
+                children_positions = [class_name_to_info[source_name]['bottom_center'] for source_name in source_names]
                 
                 # Draw proper generalization
                 draw_proper_generalization(
@@ -294,7 +281,8 @@ class UMLDiagramService:
                 # Single inheritance - add to regular connections
                 all_connections.append((source_names[0], target_name, 'inheritance'))
         
-        # Draw regular connections (non-grouped)
+        # Draw regular connections (non-grouped) through one shared drawing context
+        draw = ImageDraw.Draw(image)
         for source_name, target_name, relationship in all_connections:
             if relationship == 'inheritance' and source_name in processed_inheritance:
                 continue  # Already drawn as part of generalization
@@ -302,30 +290,21 @@ class UMLDiagramService:
             source_info = class_name_to_info[source_name]
             target_info = class_name_to_info[target_name]
             
-            source_pos = source_info['position']
-            source_size = source_info['size']
-            target_pos = target_info['position']
-            target_size = target_info['size']
-            
-            # Create class position tuples for edge calculation
-            source_class_pos = (source_pos[0], source_pos[1], source_size[0], source_size[1])
-            target_class_pos = (target_pos[0], target_pos[1], target_size[0], target_size[1])
-            
-            # Calculate centers for direction determination
-            source_center_x = source_pos[0] + source_size[0] // 2
-            source_center_y = source_pos[1] + source_size[1] // 2
-            target_center_x = target_pos[0] + target_size[0] // 2
-            target_center_y = target_pos[1] + target_size[1] // 2
-            
-            # Use ConnectionManager to get proper edge connection points
-            start_point = connection_manager._get_best_connection_point(source_class_pos, target_center_x, target_center_y)
-            end_point = connection_manager._get_best_connection_point(target_class_pos, source_center_x, source_center_y)
+            # Use ConnectionManager to get proper edge connection points,
+            # with rects and centers precomputed once per class during layout
+            start_point = connection_manager._get_best_connection_point(
+                source_info['rect'], *target_info['center'], center=source_info['center'])
+            end_point = connection_manager._get_best_connection_point(
+                target_info['rect'], *source_info['center'], center=target_info['center'])
             
             # Use uniform black color for all connections
             line_color = 'black'
             
-            print(f"🔗 Drawing {relationship} connection: {source_name} -> {target_name}")
-            print(f"   Edge points: ({start_point.x}, {start_point.y}) -> ({end_point.x}, {end_point.y})")
+            app.logger.debug(
+                "Drawing %s connection: %s -> %s, edge points (%d, %d) -> (%d, %d)",
+                relationship, source_name, target_name,
+                start_point.x, start_point.y, end_point.x, end_point.y
+            )
             
             # Draw the connection using proper edge connection points
             drawConnection(
@@ -336,29 +315,18 @@ class UMLDiagramService:
                 end_y=end_point.y,
                 connection_type=relationship,
                 line_color=line_color,
-                line_width=2
+                line_width=2,
+                draw=draw
             )
             connections_drawn += 1
                 
-        print(f"✅ Successfully drew {connections_drawn} connections with proper generalization")
-    
-    def _get_relationship_symbol(self, relationship):
-        """Get symbol for relationship type"""
-        symbols = {
-            'inheritance': '▲',
-            'association': '→',
-            'aggregation': '◇',
-            'composition': '◆',
-            'dependency': '- ->'
-        }
-        return symbols.get(relationship, '→')
+        app.logger.debug("Drew %d connections", connections_drawn)
 
 # Initialize the UML service
 uml_service = UMLDiagramService()
 
-@app.route('/')
-def index():
-    """Main page route"""
+def _load_index_html():
+    """Read the main page template, falling back to a static welcome page"""
     try:
         # For Vercel, we need to serve the HTML directly
         template_path = os.path.join(os.path.dirname(__file__), '..', 'templates', 'mainPage.html')
@@ -380,6 +348,31 @@ def index():
     except Exception as e:
         return f"Error loading template: {str(e)}"
 
+# The template is static, so read and encode it once per process rather than per page view
+INDEX_HTML = _load_index_html().encode('utf-8')
+INDEX_ETAG = hashlib.blake2b(INDEX_HTML, digest_size=16).hexdigest()
+
+def _if_none_match(etag):
+    """Whether the request's If-None-Match names etag
+    
+    Flask-Compress appends ':<algorithm>' to the strong ETag of a compressed
+    response, so the tag a browser sends back carries that suffix.
+    """
+    if_none_match = request.if_none_match
+    return if_none_match.star_tag or any(tag.rsplit(':', 1)[0] == etag for tag in if_none_match)
+
+@app.route('/')
+def index():
+    """Main page route"""
+    if _if_none_match(INDEX_ETAG):
+        response = Response(status=304)
+    else:
+        response = Response(INDEX_HTML, mimetype='text/html')
+    response.set_etag(INDEX_ETAG)
+    response.cache_control.public = True
+    response.cache_control.max_age = 300
+    return response
+
 @app.route('/api/validate-classes', methods=['POST'])
 def validate_classes():
     """Validate class data structure"""
@@ -391,8 +384,8 @@ def validate_classes():
         warnings = []
         
         # Check for duplicate class names
-        class_names = [cls.get('name', '') for cls in classes_data]
-        duplicates = [name for name in set(class_names) if class_names.count(name) > 1]
+        name_counts = Counter(cls.get('name', '') for cls in classes_data)
+        duplicates = [name for name, count in name_counts.items() if count > 1]
         if duplicates:
             errors.append(f"Duplicate class names found: {', '.join(duplicates)}")
         
@@ -400,7 +393,7 @@ def validate_classes():
         for cls in classes_data:
             for connection in cls.get('connections', []):
                 target = connection.get('targetClass')
-                if target and target not in class_names:
+                if target and target not in name_counts:
                     warnings.append(f"Class '{cls.get('name')}' has connection to non-existent class '{target}'")
         
         return jsonify({
@@ -415,6 +408,69 @@ def validate_classes():
 
 
 
+def _to_output_mode(diagram, styling_options):
+    """Convert the diagram to a 16-colour palette image when styling asks for low_color
+    
+    Diagrams are mostly white with a few outline/text colours, so a palette
+    image encodes one byte per pixel instead of three.
+    """
+    if styling_options and styling_options.get('low_color'):
+        return diagram.convert('P', palette=Image.Palette.ADAPTIVE, colors=16)
+    return diagram
+
+# Rendered PNGs keyed by a hash of the request payload, least recently used first
+DIAGRAM_CACHE_SIZE = 64
+diagram_cache = LRUCache(DIAGRAM_CACHE_SIZE)
+
+def _diagram_cache_key(classes_data, styling_options):
+    """Hash the canonical JSON form of a diagram request"""
+    return payload_key([classes_data, styling_options])
+
+def _render_png(classes_data, styling_options, key):
+    """Render and PNG-encode a diagram, reusing the cached bytes for a repeated payload
+    
+    key is the request's _diagram_cache_key. Returns (png_bytes, cached);
+    png_bytes is None when no diagram was produced. Rendering errors propagate
+    and leave the cache untouched.
+    """
+    png_data = diagram_cache.get(key)
+    if png_data is not None:
+        return png_data, True
+    
+    diagram = uml_service.generate_simple_diagram(classes_data, styling_options)
+    if diagram is None:
+        return None, False
+    
+    buffer = io.BytesIO()
+    _to_output_mode(diagram, styling_options).save(buffer, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+    png_data = buffer.getvalue()
+    
+    if len(png_data) == 0:
+        raise ValueError("Generated image is empty")
+    
+    diagram_cache.put(key, png_data)
+    return png_data, False
+
+# Multiple of 3 bytes so each chunk base64-encodes without mid-stream padding
+BASE64_CHUNK_SIZE = 57 * 1024
+
+def _stream_diagram_json(png_data, classes_count):
+    """Yield the generate-diagram JSON body, base64-encoding the PNG chunk by chunk
+    
+    Avoids holding the full base64 string and the serialized JSON in memory
+    alongside the PNG bytes.
+    """
+    head = json.dumps({
+        'success': True,
+        'message': 'PNG diagram generated successfully!',
+        'classes_count': classes_count
+    })
+    yield (head[:-1] + ', "image_data": "data:image/png;base64,').encode('utf-8')
+    png_view = memoryview(png_data)
+    for start in range(0, len(png_view), BASE64_CHUNK_SIZE):
+        yield base64.b64encode(png_view[start:start + BASE64_CHUNK_SIZE])
+    yield b'"}'
+
 @app.route('/api/generate-diagram', methods=['POST'])
 def generate_diagram():
     """Generate UML diagram as PNG"""
@@ -423,51 +479,35 @@ def generate_diagram():
         classes_data = data.get('classes', [])
         styling_options = data.get('styling', {})
         
-        # Debug: Log the received data
-        print(f"Received {len(classes_data)} classes")
-        for i, cls in enumerate(classes_data):
-            print(f"Class {i}: {cls.get('name', 'Unnamed')}")
-            print(f"  - Attributes: {len(cls.get('attributes', []))}")
-            print(f"  - Operations: {len(cls.get('operations', []))}")
-            print(f"  - Connections: {len(cls.get('connections', []))}")
-            for conn in cls.get('connections', []):
-                print(f"    -> {conn.get('targetClass', 'Unknown')} ({conn.get('relationship', 'unknown')})")
-        
         if not classes_data:
             return jsonify({'success': False, 'error': 'No classes provided'}), 400
         
-        # Generate a simple diagram image
-        diagram = uml_service.generate_simple_diagram(classes_data, styling_options)
+        # Clients that still hold the diagram for this exact payload can skip the body
+        key = _diagram_cache_key(classes_data, styling_options)
+        etag = key.hex()
+        if _if_none_match(etag):
+            return Response(status=304, headers={'ETag': f'"{etag}"'})
         
-        if diagram:
-            # Convert PIL image to base64 for JSON response
-            try:
-                buffer = io.BytesIO()
-                diagram.save(buffer, format='PNG')
-                buffer.seek(0)  # Reset buffer position
-                img_bytes = buffer.getvalue()
-                
-                if len(img_bytes) == 0:
-                    raise ValueError("Generated image is empty")
-                
-                img_str = base64.b64encode(img_bytes).decode('utf-8')
-                
-                # Validate base64 string
-                if not img_str or len(img_str) < 10:
-                    raise ValueError("Generated base64 string is invalid")
-                
-                return jsonify({
-                    'success': True,
-                    'message': 'PNG diagram generated successfully!',
-                    'image_data': f'data:image/png;base64,{img_str}',
-                    'classes_count': len(classes_data)
-                })
-            except Exception as base64_error:
-                print(f"Base64 conversion error: {base64_error}")
-                return jsonify({
-                    'success': False,
-                    'error': f'Failed to convert image to base64: {str(base64_error)}'
-                }), 500
+        # Generate a simple diagram image, or reuse the PNG from an identical request
+        try:
+            png_data, cached = _render_png(classes_data, styling_options, key)
+        except Exception as render_error:
+            app.logger.exception("Diagram rendering failed")
+            return jsonify({
+                'success': False,
+                'error': f'Failed to generate diagram image: {str(render_error)}'
+            }), 500
+        
+        if png_data is not None:
+            # Stream the PNG to the client as base64 inside the JSON body; the body is
+            # identical for cache hits and misses, so the strong ETag stays valid
+            response = Response(
+                _stream_diagram_json(png_data, len(classes_data)),
+                mimetype='application/json',
+                headers={'X-Cache': 'HIT' if cached else 'MISS'}
+            )
+            response.set_etag(etag)
+            return response
         else:
             return jsonify({
                 'success': True,
@@ -478,6 +518,35 @@ def generate_diagram():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/generate-diagram.png', methods=['POST'])
+def generate_diagram_png():
+    """Generate UML diagram and return it as a binary PNG (no base64/JSON wrapping)"""
+    try:
+        data = request.get_json()
+        classes_data = data.get('classes', [])
+        styling_options = data.get('styling', {})
+        
+        if not classes_data:
+            return jsonify({'success': False, 'error': 'No classes provided'}), 400
+        
+        key = _diagram_cache_key(classes_data, styling_options)
+        etag = key.hex()
+        if _if_none_match(etag):
+            return Response(status=304, headers={'ETag': f'"{etag}"'})
+        
+        png_data, _ = _render_png(classes_data, styling_options, key)
+        
+        if png_data is None:
+            return jsonify({'success': False, 'error': 'Failed to generate diagram'}), 500
+        
+        response = send_file(io.BytesIO(png_data), mimetype='image/png', download_name='uml_diagram.png')
+        response.set_etag(etag)
+        return response
+        
+    except Exception as e:
+        app.logger.exception("PNG diagram generation failed")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/preview-class', methods=['POST'])
 def preview_class():
     """Generate a preview of a single class"""
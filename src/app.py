@@ -7,72 +7,124 @@ Provides web interface and API endpoints for creating UML diagrams
 
 from flask import Flask, render_template, request, jsonify, send_file, url_for
 from flask_cors import CORS
+from flask_compress import Compress
 import os
 import json
+import logging
 import uuid
-import tempfile
-from datetime import datetime
-from PIL import Image
+from datetime import datetime, timedelta
+from PIL import Image, ImageDraw
 import io
 import base64
+import threading
+import time
+from collections import Counter, OrderedDict
 
 # Import our UML generation modules
-from diagramDraw import mergeBoxes, loadFonts, note, clear_notes, drawConnection
+from diagramDraw import mergeBoxes, loadFonts, note, clear_notes, drawConnection, draw_proper_generalization
 from connection import ConnectionManager, ConnectionType, UMLConnection
 from classBox import createSingleUMLClass
+from payloadCache import LRUCache, payload_key
 
 app = Flask(__name__, template_folder='../templates', static_folder='../static')
 CORS(app)  # Enable CORS for API calls
 
-# Global storage for diagram data (in production, use a database)
-diagrams_storage = {}
+# Compress text responses (PlantUML, JSON, the page itself); PNG downloads are already deflated
+app.config['COMPRESS_MIMETYPES'] = ['application/json', 'text/html', 'text/plain']
+app.config['COMPRESS_LEVEL'] = 4
+app.config['COMPRESS_MIN_SIZE'] = 512
+Compress(app)
+
+# Drawing details are logged at DEBUG; set LOG_LEVEL=DEBUG to see them
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'WARNING').upper()
+if not isinstance(logging.getLevelName(LOG_LEVEL), int):
+    app.logger.warning("Unknown LOG_LEVEL %r, using WARNING", LOG_LEVEL)
+    LOG_LEVEL = 'WARNING'
+app.logger.setLevel(LOG_LEVEL)
+
+# Global storage for diagram data (in production, use a database),
+# kept in creation order so the oldest entries are always at the front
+diagrams_storage = OrderedDict()
+diagrams_storage_lock = threading.Lock()
+
+# Generated diagrams stay downloadable for this long, up to a fixed number of them
+DIAGRAM_TTL = timedelta(minutes=10)
+DIAGRAM_STORAGE_SIZE = 512
+DIAGRAM_SWEEP_INTERVAL = 60  # seconds between background expiry sweeps
+diagram_sweeper_started = False  # the sweeper thread starts with the first stored diagram
+
+# UML visibility symbols keyed by visibility name
+VISIBILITY_SYMBOLS = {
+    'public': '+',
+    'private': '-',
+    'protected': '#'
+}
+
+# Fast zlib setting for stored diagrams and previews;
+# level 1 is no faster than 3 on these mostly-white images and encodes larger
+PNG_COMPRESS_LEVEL = 3
+
+# Note background colours keyed by note type
+NOTE_COLORS = {
+    'Standard': 'yellow',
+    'Information': 'lightblue',
+    'Warning': 'orange',
+    'Success': 'lightgreen',
+    'Confirmation': 'lightcyan',
+    'Decorative': 'lavender'
+}
+
+# PlantUML arrows keyed by relationship type
+PLANTUML_RELATIONSHIP_ARROWS = {
+    'inheritance': '<|--',
+    'association': '--',
+    'aggregation': 'o--',
+    'composition': '*--',
+    'dependency': '..>'
+}
+
+# Load fonts once per process and share them across requests
+BASE_FONT, FONT_SIZE = loadFonts()
+
+def _format_parameters(params):
+    """Format operation parameters as 'name: type' pairs separated by commas"""
+    return ', '.join([f"{p.get('name', '')}: {p.get('type', '')}" for p in params])
 
 class UMLDiagramService:
     """Service class to handle UML diagram generation"""
     
     def __init__(self):
-        self.base_font, self.font_size = loadFonts()
+        self.base_font, self.font_size = BASE_FONT, FONT_SIZE
         self.connection_manager = ConnectionManager()
     
     def create_class_box(self, class_data, outline_color='blue', outline_width=2):
         """Create a UML class box from class data using proper classBox module workflow"""
         class_name = class_data.get('name', 'UnnamedClass')
+        symbol_for = VISIBILITY_SYMBOLS.get
         
         # Format attributes using proper visibility symbols
-        attributes = []
-        for attr in class_data.get('attributes', []):
-            visibility_symbol = self.get_visibility_symbol(attr.get('visibility', 'private'))
-            attr_text = f"{visibility_symbol}{attr.get('name', '')}: {attr.get('type', '')}"
-            attributes.append(attr_text)
+        attributes = [
+            f"{symbol_for(attr.get('visibility', 'private'), '+')}{attr.get('name', '')}: {attr.get('type', '')}"
+            for attr in class_data.get('attributes', [])
+        ]
         
         # Format operations using proper visibility symbols
-        operations = []
-        for op in class_data.get('operations', []):
-            visibility_symbol = self.get_visibility_symbol(op.get('visibility', 'public'))
-            
-            # Format parameters if they exist
-            params = op.get('parameters', [])
-            if params:
-                param_str = ', '.join([f"{p.get('name', '')}: {p.get('type', '')}" for p in params])
-                op_text = f"{visibility_symbol}{op.get('name', '')}({param_str}): {op.get('returnType', 'void')}"
-            else:
-                op_text = f"{visibility_symbol}{op.get('name', '')}(): {op.get('returnType', 'void')}"
-            operations.append(op_text)
-        
-        # Use the proper classBox workflow instead of calling mergeBoxes directly
-        # This ensures proper integration with all the robust modules
-        base_font, _ = loadFonts()
+        operations = [
+            f"{symbol_for(op.get('visibility', 'public'), '+')}{op.get('name', '')}"
+            f"({_format_parameters(op.get('parameters', []))}): {op.get('returnType', 'void')}"
+            for op in class_data.get('operations', [])
+        ]
         
         # Convert to strings for classBox module
-        attributes_text = '\n'.join(attributes) if attributes else ''
-        operations_text = '\n'.join(operations) if operations else ''
+        attributes_text = '\n'.join(attributes)
+        operations_text = '\n'.join(operations)
         
-        # Use mergeBoxes with proper styling options
+        # Use mergeBoxes with proper styling options; identical boxes come from its cache
         class_box = mergeBoxes(
             name=class_name,
             attributes=attributes_text,
             operations=operations_text,
-            font=base_font,
+            font=self.base_font,
             fontSize=self.font_size,
             outline_colour=outline_color,
             outline_width=outline_width
@@ -82,12 +134,7 @@ class UMLDiagramService:
     
     def get_visibility_symbol(self, visibility):
         """Convert visibility string to UML symbol"""
-        symbols = {
-            'public': '+',
-            'private': '-',
-            'protected': '#'
-        }
-        return symbols.get(visibility, '+')
+        return VISIBILITY_SYMBOLS.get(visibility, '+')
     
     def create_diagram_preview(self, class_box, width=200, height=150):
         """Create a small preview image of a class box"""
@@ -127,23 +174,22 @@ class UMLDiagramService:
         diagram_image = Image.new('RGB', (img_width, img_height), 'white')
         
         # Create class boxes and track their positions
-        class_boxes = {}
-        class_positions = {}
+        boxes = []  # (class id, class data, class box) in input order
+        class_name_to_info = {}  # class name -> position, size and id for connection drawing
+        outline_color = styling_options.get('outline_color', 'blue')
+        outline_width = styling_options.get('outline_width', 2)
         
         # First pass: create all class boxes to know their sizes
+        total_height = 0
+        max_width = 0
         for i, class_data in enumerate(classes_data):
-            class_id = class_data.get('id', str(i))
-            class_box = self.create_class_box(
-                class_data,
-                styling_options.get('outline_color', 'blue'),
-                styling_options.get('outline_width', 2)
-            )
-            class_boxes[class_id] = class_box
+            class_box = self.create_class_box(class_data, outline_color, outline_width)
+            boxes.append((class_data.get('id', str(i)), class_data, class_box))
+            total_height += class_box.size[1]
+            max_width = max(max_width, class_box.size[0])
         
         # Calculate layout positions with better centering
         if classes_data:
-            # Calculate total height needed for all boxes
-            total_height = sum(class_boxes[class_data.get('id', str(i))].size[1] for i, class_data in enumerate(classes_data))
             vertical_spacing = 60  # Space between boxes
             total_layout_height = total_height + (vertical_spacing * (len(classes_data) - 1))
             
@@ -151,15 +197,11 @@ class UMLDiagramService:
             start_y = max(40, (img_height - total_layout_height) // 2)
             
             # Center horizontally (all boxes in single column)
-            max_width = max(class_boxes[class_data.get('id', str(i))].size[0] for i, class_data in enumerate(classes_data))
             start_x = (img_width - max_width) // 2
             
             current_y = start_y
         
-        for i, class_data in enumerate(classes_data):
-            class_id = class_data.get('id', str(i))
-            class_box = class_boxes[class_id]
-            
+        for class_id, class_data, class_box in boxes:
             # Calculate position - centered single column layout
             box_width, box_height = class_box.size
             x = (img_width - box_width) // 2  # Center each box horizontally
@@ -169,7 +211,15 @@ class UMLDiagramService:
             x = max(20, min(x, img_width - box_width - 20))
             y = max(20, min(y, img_height - box_height - 20))
             
-            class_positions[class_id] = (x, y)
+            class_name_to_info[class_data['name']] = {
+                'position': (x, y),
+                'size': class_box.size,
+                'id': class_id,
+                'rect': (x, y, box_width, box_height),
+                'center': (x + box_width // 2, y + box_height // 2),
+                'top_center': (x + box_width // 2, y),
+                'bottom_center': (x + box_width // 2, y + box_height)
+            }
             current_y += box_height + vertical_spacing
             
             # Paste class box onto diagram
@@ -190,45 +240,18 @@ class UMLDiagramService:
                     )
         
         # Draw connections
-        self._draw_connections(diagram_image, classes_data, class_positions, class_boxes)
+        self._draw_connections(diagram_image, classes_data, class_name_to_info)
         
         return diagram_image
     
     def get_note_color(self, note_type):
         """Get color for different note types"""
-        colors = {
-            'Standard': 'yellow',
-            'Information': 'lightblue',
-            'Warning': 'orange',
-            'Success': 'lightgreen',
-            'Confirmation': 'lightcyan',
-            'Decorative': 'lavender'
-        }
-        return colors.get(note_type, 'yellow')
+        return NOTE_COLORS.get(note_type, 'yellow')
     
-    def _draw_connections(self, image, classes_data, class_positions, class_boxes):
+    def _draw_connections(self, image, classes_data, class_name_to_info):
         """Draw connections between classes using proper edge connection points and generalization detection"""
-        from diagramDraw import draw_proper_generalization
-        
-        # Create a mapping of class names to IDs for connection lookup
-        class_name_to_id = {cls['name']: cls['id'] for cls in classes_data}
-        
-        # Create connection manager and register all class positions
-        connection_manager = ConnectionManager()
-        class_name_to_info = {}
-        
-        for class_data in classes_data:
-            class_id = class_data['id']
-            class_name = class_data['name']
-            if class_id in class_positions and class_id in class_boxes:
-                pos = class_positions[class_id]
-                size = class_boxes[class_id].size
-                connection_manager.add_class_position(class_name, pos[0], pos[1], size[0], size[1])
-                class_name_to_info[class_name] = {
-                    'position': pos,
-                    'size': size,
-                    'id': class_id
-                }
+        # Edge points come straight from the precomputed rects, so the shared manager needs no registration
+        connection_manager = self.connection_manager
         
         # First, collect all connections and group inheritance connections by target
         all_connections = []
@@ -261,26 +284,11 @@ class UMLDiagramService:
         for target_name, source_names in inheritance_groups.items():
             if len(source_names) > 1:
                 # Multiple inheritance - use proper generalization
-                print(f"🔗 Drawing generalization: {source_names} -> {target_name}")
-                
-                target_info = class_name_to_info[target_name]
-                target_pos = target_info['position']
-                target_size = target_info['size']
-                
-                # Calculate parent connection point (top edge center)
-                parent_x = target_pos[0] + target_size[0] // 2
-                parent_y = target_pos[1]  # Top edge
-                parent_pos = (parent_x, parent_y)
+                app.logger.debug("Drawing generalization: %s -> %s", source_names, target_name)
                 
-                # Calculate children connection points (bottom edge centers)
-                children_positions = []
-                for source_name in source_names:
-                    source_info = class_name_to_info[source_name]
-                    source_pos = source_info['position']
-                    source_size = source_info['size']
-                    child_x = source_pos[0] + source_size[0] // 2
-                    child_y = source_pos[1] + source_size[1]  # Bottom edge
-                    children_positions.append((child_x, child_y))
+                # Parent connects at its top edge center, children at their bottom edge centers
+                parent_pos = class_name_to_info[target_name]['top_center']
+                children_positions = [class_name_to_info[source_name]['bottom_center'] for source_name in source_names]
                 
                 # Draw proper generalization
                 draw_proper_generalization(
@@ -293,7 +301,8 @@ class UMLDiagramService:
                 # Single inheritance - add to regular connections
                 all_connections.append((source_names[0], target_name, 'inheritance'))
         
-        # Draw regular connections (non-grouped)
+        # Draw regular connections (non-grouped) through one shared drawing context
+        draw = ImageDraw.Draw(image)
         for source_name, target_name, relationship in all_connections:
             if relationship == 'inheritance' and source_name in processed_inheritance:
                 continue  # Already drawn as part of generalization
@@ -301,24 +310,12 @@ class UMLDiagramService:
             source_info = class_name_to_info[source_name]
             target_info = class_name_to_info[target_name]
             
-            source_pos = source_info['position']
-            source_size = source_info['size']
-            target_pos = target_info['position']
-            target_size = target_info['size']
-            
-            # Use ConnectionManager to calculate proper edge connection points
-            source_class_pos = (source_pos[0], source_pos[1], source_size[0], source_size[1])
-            target_class_pos = (target_pos[0], target_pos[1], target_size[0], target_size[1])
-            
-            # Calculate centers for direction determination
-            target_center_x = target_pos[0] + target_size[0] // 2
-            target_center_y = target_pos[1] + target_size[1] // 2
-            source_center_x = source_pos[0] + source_size[0] // 2
-            source_center_y = source_pos[1] + source_size[1] // 2
-            
-            # Get proper edge connection points using ConnectionManager logic
-            start_point = connection_manager._get_best_connection_point(source_class_pos, target_center_x, target_center_y)
-            end_point = connection_manager._get_best_connection_point(target_class_pos, source_center_x, source_center_y)
+            # Get proper edge connection points using ConnectionManager logic,
+            # with rects and centers precomputed once per class during layout
+            start_point = connection_manager._get_best_connection_point(
+                source_info['rect'], *target_info['center'], center=source_info['center'])
+            end_point = connection_manager._get_best_connection_point(
+                target_info['rect'], *source_info['center'], center=target_info['center'])
             
             # Use uniform black color for all connections
             line_color = 'black'
@@ -332,7 +329,8 @@ class UMLDiagramService:
                 end_y=end_point.y,
                 connection_type=relationship,
                 line_color=line_color,
-                line_width=2
+                line_width=2,
+                draw=draw
             )
     
 # Initialize the UML service
@@ -343,6 +341,35 @@ def index():
     """Main page route"""
     return render_template('mainPage.html')
 
+# Encoded class previews keyed by a hash of the request, least recently used first
+PREVIEW_CACHE_SIZE = 512
+preview_cache = LRUCache(PREVIEW_CACHE_SIZE)
+
+def _render_preview(class_data, styling_options):
+    """Render a class preview as (png_bytes, width, height), reusing cached results"""
+    key = payload_key([class_data, styling_options])
+    cached = preview_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    # Create class box
+    class_box = uml_service.create_class_box(
+        class_data,
+        styling_options.get('outline_color', 'blue'),
+        styling_options.get('outline_width', 2)
+    )
+    
+    # Create preview
+    preview = uml_service.create_diagram_preview(class_box)
+    
+    # Encode once; fast zlib level suits small UI previews
+    buffer = io.BytesIO()
+    preview.save(buffer, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+    
+    result = (buffer.getvalue(), preview.width, preview.height)
+    preview_cache.put(key, result)
+    return result
+
 @app.route('/api/preview-class', methods=['POST'])
 def preview_class():
     """Generate a preview of a single class box"""
@@ -351,31 +378,47 @@ def preview_class():
         class_data = data.get('classData', {})
         styling_options = data.get('styling', {})
         
-        # Create class box
-        class_box = uml_service.create_class_box(
-            class_data,
-            styling_options.get('outline_color', 'blue'),
-            styling_options.get('outline_width', 2)
-        )
-        
-        # Create preview
-        preview = uml_service.create_diagram_preview(class_box)
-        
-        # Convert to base64 for JSON response
-        buffer = io.BytesIO()
-        preview.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
+        png_data, width, height = _render_preview(class_data, styling_options)
+        preview_url = (b'data:image/png;base64,' + base64.b64encode(png_data)).decode('ascii')
         
         return jsonify({
             'success': True,
-            'preview': f'data:image/png;base64,{img_str}',
-            'width': preview.width,
-            'height': preview.height
+            'preview': preview_url,
+            'width': width,
+            'height': height
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/preview-class.png', methods=['POST'])
+def preview_class_png():
+    """Generate a preview of a single class box as a binary PNG (no base64/JSON wrapping)"""
+    try:
+        data = request.get_json()
+        class_data = data.get('classData', {})
+        styling_options = data.get('styling', {})
+        
+        png_data, width, height = _render_preview(class_data, styling_options)
+        
+        response = send_file(io.BytesIO(png_data), mimetype='image/png')
+        response.headers['X-Preview-Width'] = str(width)
+        response.headers['X-Preview-Height'] = str(height)
+        return response
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def _to_output_mode(diagram, styling_options):
+    """Convert the diagram to a 16-colour palette image when styling asks for low_color
+    
+    Diagrams are mostly white with a few outline/note colours, so a palette
+    image encodes one byte per pixel instead of three.
+    """
+    if styling_options and styling_options.get('low_color'):
+        return diagram.convert('P', palette=Image.Palette.ADAPTIVE, colors=16)
+    return diagram
+
 @app.route('/api/generate-diagram', methods=['POST'])
 def generate_diagram():
     """Generate complete UML diagram"""
@@ -393,17 +436,21 @@ def generate_diagram():
         if diagram is None:
             return jsonify({'success': False, 'error': 'Failed to generate diagram'}), 500
         
-        # Save diagram temporarily
-        diagram_id = str(uuid.uuid4())
-        temp_path = os.path.join(tempfile.gettempdir(), f'uml_diagram_{diagram_id}.png')
-        diagram.save(temp_path)
+        # Encode the diagram in memory instead of round-tripping through a temp file
+        buffer = io.BytesIO()
+        _to_output_mode(diagram, styling_options).save(buffer, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
         
-        # Store diagram info
-        diagrams_storage[diagram_id] = {
-            'path': temp_path,
-            'created': datetime.now(),
-            'classes_count': len(classes_data)
-        }
+        # Store diagram info, dropping diagrams nobody downloaded in time
+        diagram_id = str(uuid.uuid4())
+        now = datetime.now()
+        with diagrams_storage_lock:
+            _expire_diagrams(now)
+            _start_diagram_sweeper()
+            diagrams_storage[diagram_id] = {
+                'png': buffer.getvalue(),
+                'created': now,
+                'classes_count': len(classes_data)
+            }
         
         return jsonify({
             'success': True,
@@ -414,20 +461,45 @@ def generate_diagram():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _expire_diagrams(now, make_room=True):
+    """Drop diagrams older than DIAGRAM_TTL and, if asked, make room for one more entry
+    
+    Callers must hold diagrams_storage_lock.
+    """
+    capacity = DIAGRAM_STORAGE_SIZE if make_room else DIAGRAM_STORAGE_SIZE + 1
+    while diagrams_storage:
+        oldest = next(iter(diagrams_storage.values()))
+        if now - oldest['created'] <= DIAGRAM_TTL and len(diagrams_storage) < capacity:
+            break
+        diagrams_storage.popitem(last=False)
+
+def _sweep_diagrams():
+    """Periodically drop expired diagrams so an idle server releases their memory"""
+    while True:
+        time.sleep(DIAGRAM_SWEEP_INTERVAL)
+        with diagrams_storage_lock:
+            _expire_diagrams(datetime.now(), make_room=False)
+
+def _start_diagram_sweeper():
+    """Start the expiry sweeper once, so importing the app alone never spawns a thread
+    
+    Callers must hold diagrams_storage_lock.
+    """
+    global diagram_sweeper_started
+    if not diagram_sweeper_started:
+        threading.Thread(target=_sweep_diagrams, name='diagram-sweeper', daemon=True).start()
+        diagram_sweeper_started = True
+
 @app.route('/api/download/<diagram_id>')
 def download_diagram(diagram_id):
     """Download generated diagram"""
     try:
         diagram_info = diagrams_storage.get(diagram_id)
-        if not diagram_info:
+        if not diagram_info or datetime.now() - diagram_info['created'] > DIAGRAM_TTL:
             return jsonify({'error': 'Diagram not found'}), 404
         
-        diagram_path = diagram_info['path']
-        if not os.path.exists(diagram_path):
-            return jsonify({'error': 'Diagram file not found'}), 404
-        
         return send_file(
-            diagram_path,
+            io.BytesIO(diagram_info['png']),
             as_attachment=True,
             download_name=f'uml_diagram_{diagram_id}.png',
             mimetype='image/png'
@@ -446,8 +518,8 @@ def export_plantuml():
         if not classes_data:
             return jsonify({'success': False, 'error': 'No classes provided'}), 400
         
-        # Generate PlantUML code
-        plantuml_code = generate_plantuml_code(classes_data)
+        # Generate PlantUML code, reusing the result for an unchanged model
+        plantuml_code = _cached_plantuml_code(classes_data)
         
         return jsonify({
             'success': True,
@@ -459,54 +531,61 @@ def export_plantuml():
 
 def generate_plantuml_code(classes_data):
     """Generate PlantUML code from classes data"""
-    uml_text = "@startuml\n\n"
+    visibility_symbol = VISIBILITY_SYMBOLS.get
+    parts = ["@startuml\n\n"]
     
     # Add classes
     for cls in classes_data:
         class_name = cls.get('name', 'UnnamedClass')
-        uml_text += f"class {class_name} {{\n"
+        parts.append(f"class {class_name} {{\n")
         
         # Add notes
         for note in cls.get('notes', []):
             if note.get('text', '').strip():
-                uml_text += f"  note [{note.get('type', 'Standard')}]: {note['text']}\n"
+                parts.append(f"  note [{note.get('type', 'Standard')}]: {note['text']}\n")
         
         # Add separator if notes exist and other elements exist
         if cls.get('notes') and (cls.get('attributes') or cls.get('operations')):
-            uml_text += "  --\n"
+            parts.append("  --\n")
         
         # Add attributes
         for attr in cls.get('attributes', []):
-            visibility = uml_service.get_visibility_symbol(attr.get('visibility', 'private'))
-            uml_text += f"  {visibility}{attr.get('name', '')}: {attr.get('type', '')}\n"
+            visibility = visibility_symbol(attr.get('visibility', 'private'), '+')
+            parts.append(f"  {visibility}{attr.get('name', '')}: {attr.get('type', '')}\n")
         
         # Add separator between attributes and operations
         if cls.get('attributes') and cls.get('operations'):
-            uml_text += "  --\n"
+            parts.append("  --\n")
         
         # Add operations
         for op in cls.get('operations', []):
-            visibility = uml_service.get_visibility_symbol(op.get('visibility', 'public'))
-            uml_text += f"  {visibility}{op.get('name', '')}\n"
+            visibility = visibility_symbol(op.get('visibility', 'public'), '+')
+            parts.append(f"  {visibility}{op.get('name', '')}\n")
         
-        uml_text += "}\n\n"
+        parts.append("}\n\n")
     
     # Add connections
     for cls in classes_data:
         for connection in cls.get('connections', []):
             if connection.get('targetClass'):
-                relationship_symbol = {
-                    'inheritance': '<|--',
-                    'association': '--',
-                    'aggregation': 'o--',
-                    'composition': '*--',
-                    'dependency': '..>'
-                }.get(connection.get('relationship', 'association'), '--')
-                
-                uml_text += f"{cls['name']} {relationship_symbol} {connection['targetClass']}\n"
+                relationship_symbol = PLANTUML_RELATIONSHIP_ARROWS.get(connection.get('relationship', 'association'), '--')
+                parts.append(f"{cls['name']} {relationship_symbol} {connection['targetClass']}\n")
     
-    uml_text += "\n@enduml"
-    return uml_text
+    parts.append("\n@enduml")
+    return ''.join(parts)
+
+# PlantUML exports keyed by a hash of the class model, least recently used first
+PLANTUML_CACHE_SIZE = 256
+plantuml_cache = LRUCache(PLANTUML_CACHE_SIZE)
+
+def _cached_plantuml_code(classes_data):
+    """generate_plantuml_code, reusing the result for a model with the same canonical JSON"""
+    key = payload_key(classes_data)
+    plantuml_code = plantuml_cache.get(key)
+    if plantuml_code is None:
+        plantuml_code = generate_plantuml_code(classes_data)
+        plantuml_cache.put(key, plantuml_code)
+    return plantuml_code
 
 @app.route('/api/validate-classes', methods=['POST'])
 def validate_classes():
@@ -519,21 +598,19 @@ def validate_classes():
         warnings = []
         
         # Check for duplicate class names
-        class_names = [cls.get('name', '') for cls in classes_data]
-        duplicates = [name for name in set(class_names) if class_names.count(name) > 1]
+        name_counts = Counter(cls.get('name', '') for cls in classes_data)
+        duplicates = [name for name, count in name_counts.items() if count > 1]
         if duplicates:
             errors.append(f"Duplicate class names found: {', '.join(duplicates)}")
         
-        # Check for invalid connections
+        # Check for invalid connections and empty classes in one pass
+        empty_classes = []
         for cls in classes_data:
             for connection in cls.get('connections', []):
                 target = connection.get('targetClass')
-                if target and target not in class_names:
+                if target and target not in name_counts:
                     warnings.append(f"Class '{cls.get('name')}' has connection to non-existent class '{target}'")
-        
-        # Check for empty classes
-        empty_classes = []
-        for cls in classes_data:
+            
             if (not cls.get('attributes') and 
                 not cls.get('operations') and 
                 not cls.get('notes')):
@@ -1,6 +1,37 @@
+import logging
+import multiprocessing
+
 import diagramDraw
 
-def createUMLClass(class_name, attributes_list, operations_list):
+logger = logging.getLogger(__name__)
+
+def _joinLines(lines):
+    """Join a list of lines with newlines, passing strings (or None) through"""
+    if isinstance(lines, list):
+        return '\n'.join(lines)
+    return lines or ""
+
+def _renderAndSaveClass(i, name, attrs, ops):
+    """Render one class box and save it; runs in a worker process for batches"""
+    # Fonts are loaded once per process by diagramDraw
+    base_font, _ = diagramDraw.loadFonts()
+    
+    # Create the merged UML diagram
+    diagram = diagramDraw.mergeBoxes(
+        name, 
+        _joinLines(attrs), 
+        _joinLines(ops), 
+        base_font, 
+        12
+    )
+    
+    # Save with descriptive filename
+    safe_name = name.replace(" ", "_").replace("/", "_")
+    filename = f"uml_{safe_name}_{i}.png"
+    diagram.save(filename)
+    logger.debug("UML class '%s' saved as '%s'", name, filename)
+
+def createUMLClass(class_name, attributes_list, operations_list, processes=None):
     """
     Create UML class diagrams from lists of class names, attributes, and operations
     
@@ -8,43 +39,25 @@ def createUMLClass(class_name, attributes_list, operations_list):
         class_name: List of class names or single class name
         attributes_list: List of attribute strings for each class
         operations_list: List of operation strings for each class
+        processes: Optional worker process count for large batches; renders sequentially by default.
+            Callers that opt in need an ``if __name__ == "__main__":`` guard on spawn platforms.
     """
-    # Load fonts once
-    base_font, italic_font = diagramDraw.loadFonts()
-    
     # Handle single class vs multiple classes
     if isinstance(class_name, str):
         class_name = [class_name]
         attributes_list = [attributes_list]
         operations_list = [operations_list]
     
-    # Create UML diagram for each class
-    for i, (name, attrs, ops) in enumerate(zip(class_name, attributes_list, operations_list)):
-        # Convert lists to strings if needed
-        if isinstance(attrs, list):
-            attrs_string = '\n'.join(attrs)
-        else:
-            attrs_string = attrs or ""
-            
-        if isinstance(ops, list):
-            ops_string = '\n'.join(ops)
-        else:
-            ops_string = ops or ""
-        
-        # Create the merged UML diagram
-        diagram = diagramDraw.mergeBoxes(
-            name, 
-            attrs_string, 
-            ops_string, 
-            base_font, 
-            12
-        )
-        
-        # Save with descriptive filename
-        safe_name = name.replace(" ", "_").replace("/", "_")
-        filename = f"uml_{safe_name}_{i}.png"
-        diagram.save(filename)
-        print(f"✓ UML class '{name}' saved as '{filename}'")
+    jobs = [(i, name, attrs, ops) for i, (name, attrs, ops)
+            in enumerate(zip(class_name, attributes_list, operations_list))]
+    
+    # Pool start-up outweighs rendering for small batches, so fan out only when asked to
+    if processes and processes > 1 and len(jobs) > 1:
+        with multiprocessing.Pool(min(len(jobs), processes)) as pool:
+            pool.starmap(_renderAndSaveClass, jobs)
+    else:
+        for job in jobs:
+            _renderAndSaveClass(*job)
 
 def createSingleUMLClass(name, attributes, operations, filename=None):
     """
@@ -78,5 +91,5 @@ def createSingleUMLClass(name, attributes, operations, filename=None):
         filename = f"uml_{safe_name}.png"
     
     diagram.save(filename)
-    print(f"✓ UML class '{name}' saved as '{filename}'")
+    logger.debug("UML class '%s' saved as '%s'", name, filename)
     return diagram
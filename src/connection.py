@@ -3,10 +3,13 @@ UML Connection Logic and Management System
 Handles relationships between UML classes and their visual representation
 """
 
+import logging
+from collections import defaultdict
 from dataclasses import dataclass
 from typing import List, Tuple, Dict, Optional
 from enum import Enum
-import math
+
+logger = logging.getLogger(__name__)
 
 class ConnectionType(Enum):
     """Enumeration of UML relationship types"""
@@ -52,20 +55,37 @@ class ConnectionManager:
     
     def __init__(self):
         self.connections: List[UMLConnection] = []
+        self.by_id: Dict[str, UMLConnection] = {}  # connection_id: connection
+        self._index: Dict[str, int] = {}  # connection_id: position in self.connections
+        self.by_class: Dict[str, List[UMLConnection]] = defaultdict(list)  # class_name: connections touching it
         self.class_positions: Dict[str, Tuple[int, int, int, int]] = {}  # class_name: (x, y, width, height)
+        self.class_centers: Dict[str, Tuple[int, int]] = {}  # class_name: (center_x, center_y)
+    
+    def clear(self):
+        """Forget all connections and class positions so the manager can be reused"""
+        self.connections.clear()
+        self.by_id.clear()
+        self._index.clear()
+        self.by_class.clear()
+        self.class_positions.clear()
+        self.class_centers.clear()
     
     def add_class_position(self, class_name: str, x: int, y: int, width: int, height: int):
         """Register a class position for connection calculations"""
         self.class_positions[class_name] = (x, y, width, height)
+        self.class_centers[class_name] = (x + width // 2, y + height // 2)
     
     def add_connection(self, connection: UMLConnection) -> bool:
-        """Add a new connection to the diagram"""
+        """Add a new connection to the diagram; connection IDs must be unique"""
+        if connection.id in self.by_id:
+            logger.warning("Connection '%s' already exists", connection.id)
+            return False
         # Validate that both classes exist
         if connection.from_class not in self.class_positions:
-            print(f"Warning: Class '{connection.from_class}' not found")
+            logger.warning("Class '%s' not found", connection.from_class)
             return False
         if connection.to_class not in self.class_positions:
-            print(f"Warning: Class '{connection.to_class}' not found") 
+            logger.warning("Class '%s' not found", connection.to_class)
             return False
         
         # Calculate connection points
@@ -73,44 +93,67 @@ class ConnectionManager:
             connection.from_class, connection.to_class
         )
         
+        self._index[connection.id] = len(self.connections)
         self.connections.append(connection)
+        self.by_id[connection.id] = connection
+        self.by_class[connection.from_class].append(connection)
+        if connection.to_class != connection.from_class:
+            self.by_class[connection.to_class].append(connection)
         return True
     
     def remove_connection(self, connection_id: str):
-        """Remove a connection by ID"""
-        self.connections = [conn for conn in self.connections if conn.id != connection_id]
+        """Remove a connection by ID
+        
+        The last connection is moved into the freed slot, so removal does not
+        preserve the order of self.connections.
+        """
+        connection = self.by_id.pop(connection_id, None)
+        if connection is None:
+            return
+        position = self._index.pop(connection_id)
+        last = self.connections.pop()
+        if position < len(self.connections):
+            self.connections[position] = last
+            self._index[last.id] = position
+        for class_name in {connection.from_class, connection.to_class}:
+            remaining = [conn for conn in self.by_class[class_name] if conn is not connection]
+            if remaining:
+                self.by_class[class_name] = remaining
+            else:
+                del self.by_class[class_name]
     
     def get_connections_for_class(self, class_name: str) -> List[UMLConnection]:
         """Get all connections involving a specific class"""
-        return [conn for conn in self.connections 
-                if conn.from_class == class_name or conn.to_class == class_name]
+        return list(self.by_class.get(class_name, ()))
     
     def _calculate_connection_points(self, from_class: str, to_class: str) -> Tuple[ConnectionPoint, ConnectionPoint]:
         """Calculate optimal connection points between two classes"""
         from_pos = self.class_positions[from_class]
         to_pos = self.class_positions[to_class]
         
-        from_x, from_y, from_w, from_h = from_pos
-        to_x, to_y, to_w, to_h = to_pos
-        
-        # Calculate center points
-        from_center_x = from_x + from_w // 2
-        from_center_y = from_y + from_h // 2
-        to_center_x = to_x + to_w // 2
-        to_center_y = to_y + to_h // 2
+        # Center points were computed once when the classes were registered
+        from_center = self.class_centers[from_class]
+        to_center = self.class_centers[to_class]
         
         # Determine best connection sides based on relative positions
-        start_point = self._get_best_connection_point(from_pos, to_center_x, to_center_y)
-        end_point = self._get_best_connection_point(to_pos, from_center_x, from_center_y)
+        start_point = self._get_best_connection_point(from_pos, *to_center, center=from_center)
+        end_point = self._get_best_connection_point(to_pos, *from_center, center=to_center)
         
         return start_point, end_point
     
     def _get_best_connection_point(self, class_pos: Tuple[int, int, int, int], 
-                                  target_x: int, target_y: int) -> ConnectionPoint:
-        """Get the best connection point on a class border with offset to prevent arrow overlap"""
+                                  target_x: int, target_y: int,
+                                  center: Optional[Tuple[int, int]] = None) -> ConnectionPoint:
+        """Get the best connection point on a class border with offset to prevent arrow overlap
+        
+        Pass the class's precomputed center to skip recomputing it from class_pos.
+        """
         x, y, w, h = class_pos
-        center_x = x + w // 2
-        center_y = y + h // 2
+        if center is None:
+            center_x = x + w // 2
+            center_y = y + h // 2
+        else:
+            center_x, center_y = center
         
         # Calculate relative position of target
         dx = target_x - center_x
@@ -1,3 +1,6 @@
+import math
+from functools import lru_cache
+
 from PIL import Image, ImageDraw, ImageFont
 
 """ Variables """
@@ -12,8 +15,19 @@ MAX_BOX_WIDTH = 250  # Maximum width for UML boxes in pixels
 OUTLINE_COLOUR = 'black'
 OUTLINE_WIDTH = 1
 
+DASHED_CONNECTION_TYPES = frozenset({'realization', 'dependency'})
+
+# Generalization triangle below the parent edge: tip at the edge, base GENERALIZATION_TRIANGLE_SIZE lower
+GENERALIZATION_TRIANGLE_SIZE = 12
+_GENERALIZATION_TRIANGLE_OFFSETS = (
+    (0, 0),                                                                # Top point (tip) - at parent edge
+    (-(GENERALIZATION_TRIANGLE_SIZE // 2), GENERALIZATION_TRIANGLE_SIZE),  # Bottom left
+    (GENERALIZATION_TRIANGLE_SIZE // 2, GENERALIZATION_TRIANGLE_SIZE)      # Bottom right
+)
+
+@lru_cache(maxsize=None)
 def loadFonts():
-    """ Functions for drawing """
+    """ Functions for drawing; fonts are loaded once per process and shared by every caller """
     try:
         base = ImageFont.truetype(FONT_NAME, FONT_SIZE)
         italic = ImageFont.truetype(FONT_NAME, FONT_SIZE_ITALIC)
@@ -22,17 +36,33 @@ def loadFonts():
         italic = base
     return base, italic
 
-def calculateBoxWidth(text, font):
-    lines = text.split('\n')
-    max_width = max(font.getbbox(line)[2] - font.getbbox(line)[0] for line in lines)
+@lru_cache(maxsize=4096)
+def _lineBBox(font, line):
+    """ Bounding box of one line of text; attribute and operation lines repeat across boxes and requests """
+    return font.getbbox(line)
+
+def _measureLines(lines, font):
+    """ Bounding boxes for every line, measured once and shared by sizing and drawing """
+    return [_lineBBox(font, line) for line in lines]
+
+def _boxSize(bboxes):
+    """ Padded (width, height) of a box holding lines with the given bounding boxes, in one pass """
+    max_width = 0
+    total_height = 0
+    for bbox in bboxes:
+        max_width = max(max_width, bbox[2] - bbox[0])
+        total_height += bbox[3] - bbox[1]
     calculated_width = max_width + (PADDING_X * 2)  # Padding on both left and right
-    return min(calculated_width, MAX_BOX_WIDTH)
+    return min(calculated_width, MAX_BOX_WIDTH), total_height + (PADDING_Y * 2)  # Padding on both top and bottom
 
-def calculateBoxHeight(text, font):
-    lines = text.split('\n')
-    total_height = sum(font.getbbox(line)[3] - font.getbbox(line)[1] for line in lines)
-    return total_height + (PADDING_Y * 2)  # Padding on both top and bottom
+def calculateBoxSize(text, font):
+    return _boxSize(_measureLines(text.split('\n'), font))
 
+def calculateBoxWidth(text, font):
+    return calculateBoxSize(text, font)[0]
+
+def calculateBoxHeight(text, font):
+    return calculateBoxSize(text, font)[1]
 
 
 def drawBox(boxWidth, boxHeight, outline_colour=None, outline_width=None):
@@ -52,6 +82,22 @@ def drawBox(boxWidth, boxHeight, outline_colour=None, outline_width=None):
 
     return image
 
+def _drawSection(draw, lines, bboxes, font, y_offset, center_width=None):
+    """ Draw one section's lines top to bottom: centred within center_width (class name) or left-aligned with blank lines skipped """
+    for line, text_bbox in zip(lines, bboxes):
+        if center_width is not None:
+            text_width = text_bbox[2] - text_bbox[0]
+            x_position = (center_width - text_width) // 2
+        elif line and not line.isspace():
+            x_position = PADDING_X
+        else:
+            continue
+        draw.text((x_position, y_offset), line, font=font, fill='black')
+        
+        # Move to next line
+        text_height = text_bbox[3] - text_bbox[1]
+        y_offset += text_height
+
 def drawNameBox(boxWidth, boxHeight, text, font, fontSize, outline_colour=None, outline_width=None):
     # Start with a basic box
     image = drawBox(boxWidth, boxHeight, outline_colour, outline_width)
@@ -59,22 +105,7 @@ def drawNameBox(boxWidth, boxHeight, text, font, fontSize, outline_colour=None,
     
     # Draw text centered horizontally
     lines = text.split('\n')
-    y_offset = PADDING_Y
-    
-    for line in lines:
-        # Get text width for centering
-        text_bbox = font.getbbox(line)
-        text_width = text_bbox[2] - text_bbox[0]
-        
-        # Center horizontally
-        x_position = (boxWidth - text_width) // 2
-        
-        # Draw text
-        draw.text((x_position, y_offset), line, font=font, fill='black')
-        
-        # Move to next line
-        text_height = text_bbox[3] - text_bbox[1]
-        y_offset += text_height
+    _drawSection(draw, lines, _measureLines(lines, font), font, PADDING_Y, center_width=boxWidth)
     
     return image
 
@@ -86,17 +117,7 @@ def drawAttributeBox(boxWidth, boxHeight, text, font, fontSize, outline_colour=N
     
     # Draw attributes (left-aligned)
     lines = text.split('\n')
-    y_offset = PADDING_Y
-    
-    for line in lines:
-        if line.strip():  # Skip empty lines
-            # Left-align attributes
-            draw.text((PADDING_X, y_offset), line, font=font, fill='black')
-            
-            # Move to next line
-            text_bbox = font.getbbox(line)
-            text_height = text_bbox[3] - text_bbox[1]
-            y_offset += text_height
+    _drawSection(draw, lines, _measureLines(lines, font), font, PADDING_Y)
     
     return image
 
@@ -107,36 +128,41 @@ def drawOperationBox(boxWidth, boxHeight, text, font, fontSize, outline_colour=N
     
     # Draw operations (left-aligned)
     lines = text.split('\n')
-    y_offset = PADDING_Y
-    
-    for line in lines:
-        if line.strip():  # Skip empty lines
-            # Left-align operations
-            draw.text((PADDING_X, y_offset), line, font=font, fill='black')
-            
-            # Move to next line
-            text_bbox = font.getbbox(line)
-            text_height = text_bbox[3] - text_bbox[1]
-            y_offset += text_height
+    _drawSection(draw, lines, _measureLines(lines, font), font, PADDING_Y)
     
     return image
 
 def mergeBoxes(name, attributes, operations, font, fontSize, outline_colour=None, outline_width=None):
+    """ Render a complete class box; identical boxes are drawn once and handed out as copies """
     # Use default values if not provided
     if outline_colour is None:
         outline_colour = OUTLINE_COLOUR
     if outline_width is None:
         outline_width = OUTLINE_WIDTH
-        
-    # Calculate dimensions for each section
-    name_width = calculateBoxWidth(name, font)
-    name_height = calculateBoxHeight(name, font)
     
-    attr_width = calculateBoxWidth(attributes, font) if attributes else name_width
-    attr_height = calculateBoxHeight(attributes, font) if attributes else 20
+    # Callers paste onto or draw over the result, so never hand out the cached image itself
+    return _renderClassBox(name, attributes, operations, font, outline_colour, outline_width).copy()
+
+@lru_cache(maxsize=256)
+def _renderClassBox(name, attributes, operations, font, outline_colour, outline_width):
+    # Measure every line once; sizing and drawing share the same bounding boxes
+    name_lines = name.split('\n')
+    name_bboxes = _measureLines(name_lines, font)
+    name_width, name_height = _boxSize(name_bboxes)
     
-    ops_width = calculateBoxWidth(operations, font) if operations else name_width
-    ops_height = calculateBoxHeight(operations, font) if operations else 20
+    if attributes:
+        attr_lines = attributes.split('\n')
+        attr_bboxes = _measureLines(attr_lines, font)
+        attr_width, attr_height = _boxSize(attr_bboxes)
+    else:
+        attr_width, attr_height = name_width, 20
+    
+    if operations:
+        ops_lines = operations.split('\n')
+        ops_bboxes = _measureLines(ops_lines, font)
+        ops_width, ops_height = _boxSize(ops_bboxes)
+    else:
+        ops_width, ops_height = name_width, 20
     
     # Use the maximum width for consistency
     max_width = max(name_width, attr_width, ops_width)
@@ -150,15 +176,7 @@ def mergeBoxes(name, attributes, operations, font, fontSize, outline_colour=None
     draw.rectangle([0, 0, max_width-1, total_height-1], outline=outline_colour, width=outline_width)
     
     # Draw name section
-    y_offset = PADDING_Y
-    lines = name.split('\n')
-    for line in lines:
-        text_bbox = font.getbbox(line)
-        text_width = text_bbox[2] - text_bbox[0]
-        x_position = (max_width - text_width) // 2  # Center name
-        draw.text((x_position, y_offset), line, font=font, fill='black')
-        text_height = text_bbox[3] - text_bbox[1]
-        y_offset += text_height
+    _drawSection(draw, name_lines, name_bboxes, font, PADDING_Y, center_width=max_width)
     
     # Draw horizontal line after name section
     name_section_bottom = name_height
@@ -166,14 +184,7 @@ def mergeBoxes(name, attributes, operations, font, fontSize, outline_colour=None
     
     # Draw attributes section
     if attributes:
-        y_offset = name_height + PADDING_Y
-        lines = attributes.split('\n')
-        for line in lines:
-            if line.strip():
-                draw.text((PADDING_X, y_offset), line, font=font, fill='black')
-                text_bbox = font.getbbox(line)
-                text_height = text_bbox[3] - text_bbox[1]
-                y_offset += text_height
+        _drawSection(draw, attr_lines, attr_bboxes, font, name_height + PADDING_Y)
     
     # Draw horizontal line after attributes section
     attr_section_bottom = name_height + attr_height
@@ -181,14 +192,7 @@ def mergeBoxes(name, attributes, operations, font, fontSize, outline_colour=None
     
     # Draw operations section
     if operations:
-        y_offset = name_height + attr_height + PADDING_Y
-        lines = operations.split('\n')
-        for line in lines:
-            if line.strip():
-                draw.text((PADDING_X, y_offset), line, font=font, fill='black')
-                text_bbox = font.getbbox(line)
-                text_height = text_bbox[3] - text_bbox[1]
-                y_offset += text_height
+        _drawSection(draw, ops_lines, ops_bboxes, font, name_height + attr_height + PADDING_Y)
     
 
     return merged_image
@@ -230,9 +234,8 @@ def draw_proper_generalization(image, parent_pos, children_positions, line_color
     
     draw = ImageDraw.Draw(image)
     
-    # Triangle dimensions (must match the triangle function)
-    triangle_size = 12
-    triangle_bottom_y = parent_y + triangle_size
+    # Lines start at the base of the generalization triangle
+    triangle_bottom_y = parent_y + GENERALIZATION_TRIANGLE_SIZE
     
     # 1. Draw vertical line down from bottom of triangle to horizontal line
     draw.line([(parent_x, triangle_bottom_y), (parent_x, horizontal_y)], 
@@ -261,24 +264,15 @@ def draw_fixed_generalization_triangle(image, x, y, line_color='blue', line_widt
     """Draw triangle positioned below parent class (not overlapping text)"""
     draw = ImageDraw.Draw(image)
     
-    # Triangle dimensions
-    triangle_size = 12
-    
     # Triangle pointing upward, but positioned BELOW the parent class edge
     # The tip touches the parent class edge, base extends downward
-    vertices = [
-        (x, y),                           # Top point (tip) - at parent edge
-        (x - triangle_size//2, y + triangle_size),   # Bottom left
-        (x + triangle_size//2, y + triangle_size)    # Bottom right
-    ]
+    vertices = [(x + dx, y + dy) for dx, dy in _GENERALIZATION_TRIANGLE_OFFSETS]
     
     # Draw triangle with white fill and colored outline
     draw.polygon(vertices, outline=line_color, width=line_width, fill='white')
 
 def draw_generalization_triangle(image, x, y, direction_x, direction_y, line_color='black', line_width=2):
     """Draw a single triangle for generalization at the parent class"""
-    import math
-    
     draw = ImageDraw.Draw(image)
     
     # Triangle dimensions
@@ -286,12 +280,13 @@ def draw_generalization_triangle(image, x, y, direction_x, direction_y, line_col
     triangle_width = 12
     
     # Normalize direction
-    length = math.sqrt(direction_x**2 + direction_y**2)
+    length = math.hypot(direction_x, direction_y)
     if length == 0:
         return
     
-    dx_norm = direction_x / length
-    dy_norm = direction_y / length
+    inv_length = 1.0 / length
+    dx_norm = direction_x * inv_length
+    dy_norm = direction_y * inv_length
     
     # Triangle points
     tip_x = x
@@ -315,7 +310,7 @@ def draw_generalization_triangle(image, x, y, direction_x, direction_y, line_col
     # Draw triangle outline (not filled)
     draw.polygon(vertices, outline=line_color, width=line_width, fill='white')
 
-def drawConnection(image, start_x, start_y, end_x, end_y, connection_type='association', line_color='black', line_width=1):
+def drawConnection(image, start_x, start_y, end_x, end_y, connection_type='association', line_color='black', line_width=1, draw=None):
     """
     Draw UML relationship arrows on an image
     
@@ -326,6 +321,7 @@ def drawConnection(image, start_x, start_y, end_x, end_y, connection_type='assoc
         connection_type: Type of UML relationship
         line_color: Color of the line and arrow
         line_width: Width of the line
+        draw: Optional ImageDraw for image, shared across calls when drawing many connections
     
     Connection types:
         - 'association': Simple line with arrow
@@ -336,20 +332,21 @@ def drawConnection(image, start_x, start_y, end_x, end_y, connection_type='assoc
         - 'realization': Dashed line with empty triangle
         - 'dependency': Dashed line with arrow
     """
-    import math
-    draw = ImageDraw.Draw(image)
+    if draw is None:
+        draw = ImageDraw.Draw(image)
     
     # Calculate direction from start to end
     dx = end_x - start_x
     dy = end_y - start_y
-    length = math.sqrt(dx*dx + dy*dy)
+    length = math.hypot(dx, dy)
     
     if length == 0:
         return
     
     # Normalize direction
-    dx_norm = dx / length
-    dy_norm = dy / length
+    inv_length = 1.0 / length
+    dx_norm = dx * inv_length
+    dy_norm = dy * inv_length
     
     # Calculate actual line start and end points (move inward from offset points)
     arrow_offset = 15  # Same as the offset used in ConnectionManager
@@ -363,45 +360,33 @@ def drawConnection(image, start_x, start_y, end_x, end_y, connection_type='assoc
     actual_end_y = end_y - dy_norm * arrow_offset
     
     # Draw the main line between actual connection points (not through boxes)
-    if connection_type in ['realization', 'dependency']:
+    if connection_type in DASHED_CONNECTION_TYPES:
         # Draw dashed line
         draw_dashed_line(draw, actual_start_x, actual_start_y, actual_end_x, actual_end_y, line_color, line_width)
     else:
         # Draw solid line
         draw.line([(actual_start_x, actual_start_y), (actual_end_x, actual_end_y)], fill=line_color, width=line_width)
     
-    # Draw appropriate arrow/symbol at the actual end point (box edge)
-    if connection_type == 'association':
-        draw_arrow_head(draw, actual_start_x, actual_start_y, actual_end_x, actual_end_y, line_color, line_width)
-    elif connection_type == 'aggregation':
-        draw_diamond(draw, actual_end_x, actual_end_y, actual_start_x, actual_start_y, line_color, line_width, filled=False)
-    elif connection_type == 'composition':
-        draw_diamond(draw, actual_end_x, actual_end_y, actual_start_x, actual_start_y, line_color, line_width, filled=True)
-    elif connection_type == 'inheritance':
-        draw_triangle(draw, actual_start_x, actual_start_y, actual_end_x, actual_end_y, line_color, line_width, filled=False)
-    elif connection_type == 'inheritance_line':
-        # Plain line only - no arrow (for proper generalization)
-        pass  # Line already drawn above, no additional symbol needed
-    elif connection_type == 'realization':
-        draw_triangle(draw, actual_start_x, actual_start_y, actual_end_x, actual_end_y, line_color, line_width, filled=False)
-    elif connection_type == 'dependency':
-        draw_arrow_head(draw, actual_start_x, actual_start_y, actual_end_x, actual_end_y, line_color, line_width)
+    # Draw appropriate arrow/symbol at the actual end point (box edge);
+    # types without an entry (e.g. 'inheritance_line') are a plain line only
+    end_symbol = CONNECTION_END_SYMBOLS.get(connection_type)
+    if end_symbol is not None:
+        end_symbol(draw, actual_start_x, actual_start_y, actual_end_x, actual_end_y, line_color, line_width)
 
 def draw_dashed_line(draw, x1, y1, x2, y2, color, width):
     """Draw a dashed line between two points"""
-    import math
-    
     # Calculate line length and direction
     dx = x2 - x1
     dy = y2 - y1
-    length = math.sqrt(dx*dx + dy*dy)
+    length = math.hypot(dx, dy)
     
     if length == 0:
         return
     
     # Normalize direction
-    dx_norm = dx / length
-    dy_norm = dy / length
+    inv_length = 1.0 / length
+    dx_norm = dx * inv_length
+    dy_norm = dy * inv_length
     
     # Draw dashes
     dash_length = 5
@@ -423,19 +408,18 @@ def draw_dashed_line(draw, x1, y1, x2, y2, color, width):
 
 def draw_arrow_head(draw, start_x, start_y, end_x, end_y, color, width):
     """Draw an arrow head at the end point"""
-    import math
-    
     # Calculate arrow direction
     dx = end_x - start_x
     dy = end_y - start_y
-    length = math.sqrt(dx*dx + dy*dy)
+    length = math.hypot(dx, dy)
     
     if length == 0:
         return
     
     # Normalize direction
-    dx_norm = dx / length
-    dy_norm = dy / length
+    inv_length = 1.0 / length
+    dx_norm = dx * inv_length
+    dy_norm = dy * inv_length
     
     # Arrow dimensions
     arrow_length = 10
@@ -458,19 +442,18 @@ def draw_arrow_head(draw, start_x, start_y, end_x, end_y, color, width):
 
 def draw_diamond(draw, end_x, end_y, start_x, start_y, color, width, filled=False):
     """Draw a diamond shape at the end point"""
-    import math
-    
     # Calculate direction
     dx = end_x - start_x
     dy = end_y - start_y
-    length = math.sqrt(dx*dx + dy*dy)
+    length = math.hypot(dx, dy)
     
     if length == 0:
         return
     
     # Normalize direction
-    dx_norm = dx / length
-    dy_norm = dy / length
+    inv_length = 1.0 / length
+    dx_norm = dx * inv_length
+    dy_norm = dy * inv_length
     
     # Diamond dimensions
     diamond_length = 12
@@ -502,19 +485,18 @@ def draw_diamond(draw, end_x, end_y, start_x, start_y, color, width, filled=Fals
 
 def draw_triangle(draw, start_x, start_y, end_x, end_y, color, width, filled=False):
     """Draw a triangle at the end point (for inheritance)"""
-    import math
-    
     # Calculate direction
     dx = end_x - start_x
     dy = end_y - start_y
-    length = math.sqrt(dx*dx + dy*dy)
+    length = math.hypot(dx, dy)
     
     if length == 0:
         return
     
     # Normalize direction
-    dx_norm = dx / length  
-    dy_norm = dy / length
+    inv_length = 1.0 / length
+    dx_norm = dx * inv_length
+    dy_norm = dy * inv_length
     
     # Triangle dimensions
     triangle_length = 12
@@ -543,13 +525,31 @@ def draw_triangle(draw, start_x, start_y, end_x, end_y, color, width, filled=Fal
     else:
         draw.polygon(points, fill='white', outline=color, width=width)
 
-# Global list to track existing notes for collision detection
-_existing_notes = []
+# End symbol drawn at the target of each connection type, all called as
+# (draw, start_x, start_y, end_x, end_y, color, width)
+CONNECTION_END_SYMBOLS = {
+    'association': draw_arrow_head,
+    'aggregation': lambda draw, sx, sy, ex, ey, color, width: draw_diamond(draw, ex, ey, sx, sy, color, width, filled=False),
+    'composition': lambda draw, sx, sy, ex, ey, color, width: draw_diamond(draw, ex, ey, sx, sy, color, width, filled=True),
+    'inheritance': draw_triangle,
+    'realization': draw_triangle,
+    'dependency': draw_arrow_head,
+}
+
+# Uniform grid of existing notes for collision detection, so checks only look at nearby ones
+NOTE_GRID_CELL = 64  # pixels per grid cell side
+_note_grid = {}  # (cell_x, cell_y) -> [(x, y, width, height), ...]
 
 def clear_notes():
-    """Clear the list of existing notes (call at start of new diagram)"""
-    global _existing_notes
-    _existing_notes = []
+    """Clear the existing notes (call at start of new diagram)"""
+    global _note_grid
+    _note_grid = {}
+
+def _note_cells(x, y, width, height):
+    """Grid cells touched by a note rectangle"""
+    return [(cell_x, cell_y)
+            for cell_x in range(int(x // NOTE_GRID_CELL), int((x + width) // NOTE_GRID_CELL) + 1)
+            for cell_y in range(int(y // NOTE_GRID_CELL), int((y + height) // NOTE_GRID_CELL) + 1)]
 
 def note(image, note_text, class_position, class_size, font, font_size=10, 
          note_position='right', offset=20, note_color='yellow', text_color='black', 
@@ -575,7 +575,6 @@ def note(image, note_text, class_position, class_size, font, font_size=10,
     Returns:
         (note_x, note_y, note_width, note_height): Position and size of the created note
     """
-    global _existing_notes
     draw = ImageDraw.Draw(image)
     
     class_x, class_y = class_position
@@ -610,12 +609,13 @@ def note(image, note_text, class_position, class_size, font, font_size=10,
         if not avoid_collisions:
             return False
         
-        for existing in _existing_notes:
-            ex_x, ex_y, ex_w, ex_h = existing
-            # Check rectangle overlap
-            if (x < ex_x + ex_w and x + width > ex_x and 
-                y < ex_y + ex_h and y + height > ex_y):
-                return True
+        # Only notes sharing a grid cell with the candidate can overlap it
+        for cell in _note_cells(x, y, width, height):
+            for ex_x, ex_y, ex_w, ex_h in _note_grid.get(cell, ()):
+                # Check rectangle overlap
+                if (x < ex_x + ex_w and x + width > ex_x and 
+                    y < ex_y + ex_h and y + height > ex_y):
+                    return True
         return False
     
     def find_best_position():
@@ -675,7 +675,9 @@ def note(image, note_text, class_position, class_size, font, font_size=10,
     
     # Record this note's position for future collision detection
     if avoid_collisions:
-        _existing_notes.append((note_x, note_y, note_width, note_height))
+        note_rect = (note_x, note_y, note_width, note_height)
+        for cell in _note_cells(*note_rect):
+            _note_grid.setdefault(cell, []).append(note_rect)
     
     # Draw note background
     note_rect = [
@@ -0,0 +1,41 @@
+"""
+Small thread-safe caches keyed by a hash of a JSON request payload
+Shared by the Flask apps for rendered diagrams, previews and PlantUML exports
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+def payload_key(obj):
+    """Hash the canonical JSON form of a request payload into a 16-byte digest"""
+    payload = json.dumps(obj, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).digest()
+
+class LRUCache:
+    """Bounded mapping guarded by a lock; the least recently used entry is evicted first"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value and mark it as recently used, or None on a miss"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)